@@ -0,0 +1,416 @@
+"""Synthetic data and API benchmarks behind the seed-data and bench-api commands.
+
+Imported lazily by those commands, so web workers never load it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import http.cookiejar
+import json
+import os
+import platform
+import sqlite3
+import time
+import urllib.error
+import urllib.request
+
+import click
+import numpy as np
+
+from backend.app import (
+    AUDIT_INSERT_SQL, COUNTED_TABLES, app, letter_grades, load_grading_scale, open_connection,
+    password_hasher, read_counters, utc_timestamp
+)
+
+SEED_BRANCHES = ["CSE", "ECE", "ME", "CE", "EEE", "IT"]
+SEED_FIRST_NAMES = [
+    "Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Rohan", "Sneha", "Vihaan", "Ananya",
+    "Kabir", "Meera", "Nikhil", "Pooja", "Rahul", "Saanvi", "Tanvi", "Varun", "Yash", "Zoya"
+]
+SEED_LAST_NAMES = [
+    "Sharma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Joshi", "Kulkarni", "Mehta", "Singh",
+    "Das", "Bose", "Rao", "Pillai", "Chopra", "Menon", "Desai", "Kapoor", "Verma", "Shetty"
+]
+SEED_SUBJECTS = [
+    "Mathematics", "Physics", "Chemistry", "Programming", "Data Structures", "Electronics",
+    "Mechanics", "Thermodynamics", "Networks", "Databases", "Operating Systems", "Economics"
+]
+SEED_ACTIONS = [
+    "ADD_STUDENT", "UPDATE_STUDENT", "MARK_ATTENDANCE", "MARK_ATTENDANCE_BATCH",
+    "ADD_GRADE", "UPDATE_GRADE", "DELETE_ATTENDANCE", "UPLOAD_PROFILE_PICTURE"
+]
+SEED_CHUNK_ROWS = 100_000
+BENCH_USERNAME = "bench-admin"
+BENCH_PASSWORD = "bench-password"
+BENCH_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+
+
+def seed_rows(c, sql, rows, label):
+    """executemany in SEED_CHUNK_ROWS chunks, one transaction per chunk"""
+    total = 0
+    for start in range(0, len(rows), SEED_CHUNK_ROWS):
+        chunk = rows[start:start + SEED_CHUNK_ROWS]
+        c.executemany(sql, chunk)
+        c.connection.commit()
+        total += len(chunk)
+        print(f"  {label}: {total}/{len(rows)}")
+
+
+def seed_students(c, rng, count):
+    c.execute("SELECT COALESCE(MAX(id), 0) FROM students")
+    offset = c.fetchone()[0]
+    branches = rng.choice(SEED_BRANCHES, count)
+    years = rng.integers(1, 5, count)
+    first = rng.choice(SEED_FIRST_NAMES, count)
+    last = rng.choice(SEED_LAST_NAMES, count)
+    rows = [
+        (f"{first[i]} {last[i]}", f"{branches[i]}{offset + i + 1:07d}", branches[i], str(years[i]))
+        for i in range(count)
+    ]
+    seed_rows(c, "INSERT INTO students (name, roll, branch, year) VALUES (?, ?, ?, ?)", rows, "students")
+    return np.arange(offset + 1, offset + count + 1)
+
+
+def seed_users(c, rng, count):
+    hashed = password_hasher.hash(BENCH_PASSWORD)
+    c.execute("""
+        INSERT OR IGNORE INTO users (username, email, password_hash, role)
+        VALUES (?, ?, ?, 'admin')
+    """, (BENCH_USERNAME, f"{BENCH_USERNAME}@example.com", hashed))
+    c.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    offset = c.fetchone()[0]
+    rows = [
+        (f"seed-user-{offset + i}", f"seed-user-{offset + i}@example.com", hashed,
+         "admin" if rng.random() < 0.1 else "user")
+        for i in range(count)
+    ]
+    seed_rows(c, "INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)", rows, "users")
+    c.execute("SELECT id FROM users")
+    return np.array([r[0] for r in c.fetchall()])
+
+
+def seed_attendance(c, rng, student_ids, user_ids, count):
+    """The most recent teaching days for every student, each with their own attendance habit"""
+    days_per_student = -(-count // len(student_ids))
+    today = np.datetime64(datetime.date.today())
+    calendar = np.arange(today - np.timedelta64(days_per_student * 2 + 14, "D"), today)
+    days = calendar[np.is_busday(calendar)][-days_per_student:].astype(str)
+
+    # Student-level propensity from Beta(8, 2): mostly ~80%, with a tail of at-risk students
+    propensity = rng.beta(8, 2, len(student_ids))
+    per_chunk = max(1, SEED_CHUNK_ROWS // len(days))
+    written = 0
+    for start in range(0, len(student_ids), per_chunk):
+        ids = student_ids[start:start + per_chunk]
+        draws = rng.random((len(ids), len(days)))
+        late = rng.random((len(ids), len(days))) < 0.15
+        present = draws < propensity[start:start + per_chunk, None]
+        status = np.where(present, "Present", np.where(late, "Late", "Absent"))
+        marked_by = rng.choice(user_ids, len(days))
+        rows = [
+            (int(sid), days[d], status[i, d], int(marked_by[d]))
+            for i, sid in enumerate(ids)
+            for d in range(len(days))
+        ][:count - written]
+        c.executemany("""
+            INSERT OR IGNORE INTO attendance (student_id, attendance_date, status, marked_by)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        c.connection.commit()
+        written += len(rows)
+        print(f"  attendance: {written}/{count}")
+        if written >= count:
+            break
+
+
+def seed_grades(c, rng, student_ids, user_ids, count):
+    ability = rng.normal(65, 12, len(student_ids))
+    student_idx = rng.integers(0, len(student_ids), count)
+    marks = np.clip(np.round(ability[student_idx] + rng.normal(0, 10, count), 1), 0, 100)
+    grades = letter_grades(c, marks)
+    semesters = rng.integers(1, 9, count)
+    subjects = rng.choice(SEED_SUBJECTS, count)
+    added_by = rng.choice(user_ids, count)
+    rows = [
+        (int(student_ids[student_idx[i]]), subjects[i], float(marks[i]), grades[i],
+         str(semesters[i]), int(added_by[i]))
+        for i in range(count)
+    ]
+    seed_rows(c, """
+        INSERT INTO grades (student_id, subject, marks, grade, semester, added_by)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows, "grades")
+
+
+def seed_audit_logs(c, rng, user_ids, count):
+    now = np.datetime64(utc_timestamp().replace(" ", "T"), "s")
+    ages = rng.integers(0, 365 * 24 * 3600, count).astype("timedelta64[s]")
+    timestamps = np.char.replace(np.datetime_as_string(now - ages), "T", " ")
+    actions = rng.choice(SEED_ACTIONS, count)
+    users = rng.choice(user_ids, count)
+    rows = [
+        (int(users[i]), actions[i], f"Seeded {actions[i].lower()} event", timestamps[i])
+        for i in range(count)
+    ]
+    seed_rows(c, AUDIT_INSERT_SQL, rows, "audit_logs")
+
+
+def seed_data(db_path, students, attendance, grades, audit_logs, users, seed, yes):
+    """Fill the database with a realistic synthetic dataset"""
+    conn = open_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM students")
+    if c.fetchone()[0] and not yes:
+        raise click.ClickException(f"{db_path} already has students; pass --yes to add to it")
+
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    print(f"Seeding {db_path}")
+    user_ids = seed_users(c, rng, users)
+    student_ids = seed_students(c, rng, students) if students else np.array([], dtype=np.int64)
+    if attendance and student_ids.size:
+        seed_attendance(c, rng, student_ids, user_ids, attendance)
+    if grades and student_ids.size:
+        seed_grades(c, rng, student_ids, user_ids, grades)
+    if audit_logs:
+        seed_audit_logs(c, rng, user_ids, audit_logs)
+    c.execute("PRAGMA optimize")
+    conn.close()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s; log in as {BENCH_USERNAME} / {BENCH_PASSWORD}")
+
+
+class TestClientDriver:
+    """Drive the app in-process through Flask's test client"""
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HTTPDriver:
+    """Drive a running server, e.g. a local gunicorn, over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={"Content-Type": "application/json"} if data else {}
+        )
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def host_profile():
+    """What a baseline was recorded on, stored next to its numbers"""
+    cpu_model = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu_model = next(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    try:
+        memory_gb = round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**30, 1)
+    except (AttributeError, ValueError, OSError):
+        memory_gb = None
+    return {
+        "platform": platform.platform(),
+        "cpu_model": cpu_model,
+        "cpus": os.cpu_count(),
+        "memory_gb": memory_gb,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "recorded": datetime.date.today().isoformat(),
+    }
+
+
+def describe_host(profile):
+    return (f"{profile.get('cpus')} x {profile.get('cpu_model', '?')}, {profile.get('memory_gb', '?')} GB, "
+            f"Python {profile.get('python')}, SQLite {profile.get('sqlite')}, recorded {profile.get('recorded')}")
+
+
+def bench_samples(c):
+    """Real ids and values for the parameterised routes"""
+    def first(sql):
+        c.execute(sql)
+        row = c.fetchone()
+        return row[0] if row else None
+
+    sample = {
+        "student_id": first("SELECT id FROM students ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM students)"),
+        "grade_id": first("SELECT MAX(id) FROM grades"),
+        # Role changes target another user; admins cannot change their own role
+        "user_id": first(f"SELECT id FROM users WHERE username != '{BENCH_USERNAME}' ORDER BY id DESC LIMIT 1"),
+        "date": first("SELECT MAX(attendance_date) FROM attendance") or datetime.date.today().isoformat(),
+        "semester": first("SELECT semester FROM grades ORDER BY id DESC LIMIT 1") or "1",
+        "subject": first("SELECT subject FROM grades ORDER BY id DESC LIMIT 1") or "Mathematics",
+    }
+    c.execute("SELECT name, roll, branch, year FROM students WHERE id = ?", (sample["student_id"],))
+    sample["student"] = dict(zip(("name", "roll", "branch", "year"), c.fetchone() or ()))
+    c.execute("SELECT role FROM users WHERE id = ?", (sample["user_id"],))
+    sample["role"] = (c.fetchone() or ("user",))[0]
+    c.execute("SELECT marks FROM grades WHERE id = ?", (sample["grade_id"],))
+    sample["marks"] = (c.fetchone() or (75,))[0]
+    c.execute("SELECT id FROM students ORDER BY id LIMIT 50")
+    sample["ids"] = ",".join(str(r[0]) for r in c.fetchall())
+    thresholds, grades = load_grading_scale(c)
+    sample["scale"] = [{"min_marks": float(t), "grade": g} for t, g in zip(thresholds, grades)]
+    return sample
+
+
+# (route, method, path, body, heavy). heavy routes stream whole tables and run 1/20 as often.
+# Idempotent writes are included; deletes, uploads and imports consume data and are not.
+BENCH_SCENARIOS = [
+    ("/api/students", "GET", "/api/students?limit=50", None, False),
+    ("/api/students?ids", "GET", "/api/students?ids={ids}", None, False),
+    ("/api/students/search", "GET", "/api/students/search?q={student[roll]}", None, False),
+    ("/api/students/<int:student_id>", "GET", "/api/students/{student_id}", None, False),
+    ("/api/students/<int:student_id>/full", "GET", "/api/students/{student_id}/full", None, False),
+    ("/api/students/<int:student_id>", "PUT", "/api/students/{student_id}", lambda s: s["student"], False),
+    ("/api/students/analytics", "GET", "/api/students/analytics", None, False),
+    ("/api/dashboard/summary", "GET", "/api/dashboard/summary", None, False),
+    ("/api/users", "GET", "/api/users", None, False),
+    ("/api/users/<int:user_id>/role", "PUT", "/api/users/{user_id}/role", lambda s: {"role": s["role"]}, False),
+    ("/api/audit-logs", "GET", "/api/audit-logs", None, False),
+    ("/api/attendance", "GET", "/api/attendance?date={date}", None, False),
+    ("/api/attendance", "POST", "/api/attendance",
+     lambda s: {"student_id": s["student_id"], "date": s["date"], "status": "Present"}, False),
+    ("/api/attendance/batch", "POST", "/api/attendance/batch",
+     lambda s: {"date": s["date"], "records": [{"student_id": s["student_id"], "status": "Present"}]}, False),
+    ("/api/attendance/student/<int:student_id>", "GET", "/api/attendance/student/{student_id}", None, False),
+    ("/api/attendance/student/<int:student_id>/summary", "GET",
+     "/api/attendance/student/{student_id}/summary", None, False),
+    ("/api/attendance/cohort", "GET", "/api/attendance/cohort?branch=CSE&year=2&below=75", None, False),
+    ("/api/grades", "GET", "/api/grades", None, False),
+    ("/api/grades/student/<int:student_id>", "GET", "/api/grades/student/{student_id}", None, False),
+    ("/api/grades/stats", "GET", "/api/grades/stats?semester={semester}&subject={subject}&limit=20", None, False),
+    ("/api/grades/<int:grade_id>", "PUT", "/api/grades/{grade_id}", lambda s: {"marks": s["marks"]}, False),
+    ("/api/grading-scale", "GET", "/api/grading-scale", None, False),
+    ("/api/grading-scale", "PUT", "/api/grading-scale", lambda s: s["scale"], False),
+    ("/api/debug/db-status", "GET", "/api/debug/db-status", None, False),
+    ("/api/export/students", "GET", "/api/export/students?format=ndjson", None, True),
+    ("/api/export/attendance", "GET", "/api/export/attendance?from={date}&to={date}", None, True),
+    ("/api/export/grades", "GET", "/api/export/grades", None, True),
+]
+
+
+def run_scenario(drivers, method, path, body, count):
+    """Issue `count` requests spread over the drivers; return (latencies in s, errors, elapsed)"""
+    def worker(driver, n):
+        timings, failed = [], 0
+        for _ in range(n):
+            started = time.perf_counter()
+            status = driver.request(method, path, body)
+            timings.append(time.perf_counter() - started)
+            failed += status >= 400
+        return timings, failed
+
+    shares = [count // len(drivers) + (i < count % len(drivers)) for i in range(len(drivers))]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(drivers)) as pool:
+        results = list(pool.map(worker, drivers, shares))
+    elapsed = time.perf_counter() - started
+    latencies = [t for timings, _ in results for t in timings]
+    return latencies, sum(failed for _, failed in results), elapsed
+
+
+def bench_api(count, concurrency, url, routes, baseline, save, tolerance):
+    """Benchmark every /api route and compare with, or save, the baseline"""
+    conn = open_connection()
+    sample = bench_samples(conn.cursor())
+    conn.close()
+    if sample["student_id"] is None:
+        raise click.ClickException("No students to benchmark against; run seed-data first")
+
+    drivers = [HTTPDriver(url) if url else TestClientDriver() for _ in range(concurrency)]
+    for driver in drivers:
+        if driver.request("POST", "/login", {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}) != 200:
+            raise click.ClickException(f"Could not log in as {BENCH_USERNAME}; run seed-data first")
+
+    covered = {(route.split("?")[0], method) for route, method, *_ in BENCH_SCENARIOS}
+    skipped = sorted(
+        f"{method} {rule.rule}"
+        for rule in app.url_map.iter_rules() if rule.rule.startswith("/api/")
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+        if (rule.rule, method) not in covered
+    )
+
+    results = {}
+    print(f"{'route':<58} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, method, path, body, heavy in BENCH_SCENARIOS:
+        name = f"{method} {route}"
+        if routes and not any(r in name for r in routes):
+            continue
+        n = max(1, count // 20) if heavy else count
+        latencies, errors, elapsed = run_scenario(
+            drivers, method, path.format(**sample), body(sample) if body else None, n
+        )
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, (50, 95, 99))
+        results[name] = {
+            "requests": n,
+            "rps": round(n / elapsed, 1),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "errors": errors,
+        }
+        print(f"{name:<58} {n / elapsed:>9.1f} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} {errors:>7}")
+    if skipped:
+        print(f"Not benchmarked: {', '.join(skipped)}")
+
+    previous, recorded_on = {}, None
+    if os.path.exists(baseline):
+        with open(baseline) as f:
+            stored = json.load(f)
+        previous, recorded_on = stored.get("routes", {}), stored.get("machine")
+    if recorded_on and not save:
+        print(f"Baseline host: {describe_host(recorded_on)}")
+        print(f"This host:     {describe_host(host_profile())}")
+        if recorded_on.get("cpus") != os.cpu_count():
+            print("Warning: CPU counts differ; re-save the baseline on this machine before trusting regressions")
+
+    regressions = []
+    for name, current in results.items():
+        base = previous.get(name)
+        if not base:
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0
+        rps_change = current["rps"] / base["rps"] - 1 if base["rps"] else 0
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(f"{name}: p95 {p95_change:+.0%}, req/s {rps_change:+.0%}")
+
+    if save:
+        c = open_connection().cursor()
+        dataset = {table: 0 for table in COUNTED_TABLES}
+        dataset.update(read_counters(c, "table"))
+        c.connection.close()
+        with open(baseline, "w") as f:
+            json.dump({
+                "dataset": dataset,
+                # Numbers only compare well on similar hardware; re-save on yours
+                "machine": host_profile(),
+                "settings": {"requests": count, "concurrency": concurrency, "target": url or "test-client"},
+                "routes": dict(previous, **results),
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {baseline}")
+    elif regressions:
+        print("Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    elif previous:
+        print(f"No regressions beyond {tolerance:.0%} against {baseline}")
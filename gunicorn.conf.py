@@ -0,0 +1,24 @@
+"""gunicorn settings, loaded automatically when gunicorn starts in this directory"""
+import os
+
+# /api/events holds a request open for as long as a dashboard tab is open,
+# and gthread parks each one on a thread. Size the thread pool as the
+# stream cap plus a fixed set of threads that streams can never take, so
+# API requests always have WEB_REQUEST_THREADS threads free. A parked
+# thread costs its stack's touched pages and one socket, but no CPU.
+worker_class = "gthread"
+stream_threads = int(os.environ.setdefault("EVENTS_MAX_SUBSCRIBERS", "500"))
+request_threads = int(os.environ.get("WEB_REQUEST_THREADS", "32"))
+threads = stream_threads + request_threads
+# gthread refuses connections beyond this, idle keep-alive ones included
+worker_connections = max(1000, threads * 2)
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+
+def post_fork(server, worker):
+    # Fork the password-hashing pool while the worker is still single
+    # threaded, before the audit writer, event poller or request threads start
+    from backend.app import attendance_index, password_hasher
+    password_hasher.start()
+    # Then build the attendance index in the background before requests arrive
+    attendance_index.warm()
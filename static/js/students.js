@@ -0,0 +1,22 @@
+// Student lookups shared by the admin pages. Pages load students a page
+// or a search at a time instead of walking the whole roster.
+
+// One page of /api/students sorted by name; resolves to { students, next, total }
+async function fetchStudentPage(cursor = null, pageSize = 100) {
+    const params = new URLSearchParams({ limit: pageSize, sort: 'name' });
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`/api/students?${params}`);
+    if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+    return {
+        students: await res.json(),
+        next: res.headers.get('X-Next-Cursor'),
+        total: parseInt(res.headers.get('X-Total-Count') || '0')
+    };
+}
+
+// Best full-text matches on name, roll or branch
+async function searchStudents(query, limit = 50) {
+    const res = await fetch(`/api/students/search?${new URLSearchParams({ q: query, limit })}`);
+    if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+    return res.json();
+}
@@ -0,0 +1,54 @@
+"""Shared fixtures: every test gets its own database and upload folder."""
+import os
+import tempfile
+
+# backend.app reads its settings and opens the database at import time,
+# so point everything at a scratch directory before importing it
+_scratch = tempfile.mkdtemp(prefix="sms-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_scratch, "import.db")
+os.environ["UPLOAD_FOLDER"] = os.path.join(_scratch, "uploads")
+os.environ["AUDIT_MODE"] = "sync"
+os.environ["HASH_WORKERS"] = "0"
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+import pytest
+
+from backend import app as app_module
+
+ADMIN = {"username": "admin", "email": "admin@example.com", "password": "admin-password"}
+
+
+@pytest.fixture
+def sms(tmp_path, monkeypatch):
+    """The backend module, pointed at a fresh database and upload folder"""
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(app_module, "DB_PATH", str(tmp_path / "students.db"))
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(uploads))
+    monkeypatch.setattr(app_module, "db_pool", app_module.ConnectionPool(4))
+    monkeypatch.setattr(app_module, "attendance_index", app_module.AttendanceBitsetIndex())
+    monkeypatch.setattr(app_module.app, "testing", True)
+    app_module.grade_stats_cache.clear()
+    app_module.init_db()
+    return app_module
+
+
+@pytest.fixture
+def client(sms):
+    return sms.app.test_client()
+
+
+@pytest.fixture
+def admin(client):
+    """A test client logged in as the first registered user, who is the admin"""
+    assert client.post("/register", json=ADMIN).status_code == 200
+    assert client.post("/login", json=ADMIN).status_code == 200
+    return client
+
+
+@pytest.fixture
+def db(sms):
+    """A direct connection to the test database"""
+    conn = sms.open_connection()
+    yield conn
+    conn.close()
@@ -0,0 +1,81 @@
+import pytest
+
+
+@pytest.fixture
+def students(admin, db):
+    db.executemany("INSERT INTO students (name, roll, branch, year) VALUES (?, ?, 'Computer', 'FE')",
+                   [("Asha", "R1"), ("Ravi", "R2")])
+    db.commit()
+    return admin
+
+
+def attendance_rows(db):
+    return db.execute("SELECT student_id, attendance_date, status FROM attendance ORDER BY student_id").fetchall()
+
+
+def test_batch_marks_every_record(students, db):
+    response = students.post("/api/attendance/batch", json={
+        "date": "2026-01-05",
+        "records": [{"student_id": 1, "status": "Present"}, {"student_id": 2, "status": "Absent"}]
+    })
+
+    assert response.status_code == 201
+    assert attendance_rows(db) == [(1, "2026-01-05", "Present"), (2, "2026-01-05", "Absent")]
+
+
+def test_batch_rejects_unknown_students(students, db):
+    response = students.post("/api/attendance/batch", json={
+        "date": "2026-01-05",
+        "records": [{"student_id": 1, "status": "Present"}, {"student_id": 99999, "status": "Present"}]
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()["student_ids"] == [99999]
+    assert attendance_rows(db) == []
+
+
+@pytest.mark.parametrize("date", ["yesterday", "2026-1-5", "2026-02-30", 20260105])
+def test_batch_rejects_malformed_dates(students, db, date):
+    response = students.post("/api/attendance/batch", json={
+        "date": date, "records": [{"student_id": 1, "status": "Present"}]
+    })
+
+    assert response.status_code == 400
+    assert attendance_rows(db) == []
+
+
+def test_bitmap_history_skips_malformed_stored_dates(students, db):
+    for date in ("2026-01-01", "2026-01-31", "05/01/2026", "2026-1-9"):
+        students.post("/api/attendance", json={"student_id": 1, "date": date, "status": "Present"})
+
+    response = students.get("/api/attendance/student/1?format=bitmap")
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["months"] == {"2026-01": [1 | 1 << 30, 0, 0]}
+    assert sorted(body["invalid_dates"]) == ["05/01/2026", "2026-1-9"]
+
+
+@pytest.mark.parametrize("status", ["present", "Excused", 1])
+def test_batch_rejects_unknown_statuses(students, db, status):
+    response = students.post("/api/attendance/batch", json={
+        "date": "2026-01-05",
+        "records": [{"student_id": 1, "status": "Present"}, {"student_id": 2, "status": status}]
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Record 1: status must be one of")
+    assert attendance_rows(db) == []
+
+
+def test_single_mark_rejects_unknown_statuses(students, db):
+    response = students.post("/api/attendance", json={"student_id": 1, "date": "2026-01-05", "status": "Excused"})
+
+    assert response.status_code == 400
+    assert attendance_rows(db) == []
+
+
+def test_attendance_page_batches_at_the_server_limit(students, sms):
+    page = students.get("/admin/attendance").get_data(as_text=True)
+
+    assert f"const BATCH_SIZE = {sms.MAX_ATTENDANCE_BATCH};" in page
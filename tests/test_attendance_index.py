@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+import pytest
+
+START, END = np.datetime64("2026-01-01"), np.datetime64("2026-06-30")
+
+
+@pytest.fixture
+def index(sms, db, monkeypatch):
+    index = sms.AttendanceBitsetIndex()
+    rebuilds = []
+    rebuild = index.rebuild
+    monkeypatch.setattr(index, "rebuild", lambda: rebuilds.append(1) or rebuild())
+    index.rebuilds = rebuilds
+    db.executemany("INSERT INTO students (id, name, roll, branch, year) VALUES (?, ?, ?, 'Computer', 'FE')",
+                   [(i, f"S{i}", f"R{i}") for i in (1, 2, 3)])
+    db.commit()
+    return index
+
+
+def mark(db, rows):
+    db.executemany("""
+        INSERT INTO attendance (student_id, attendance_date, status) VALUES (?, ?, ?)
+        ON CONFLICT(student_id, attendance_date) DO UPDATE SET status = excluded.status
+    """, rows)
+    db.commit()
+
+
+def expected(db, ids):
+    present, marked = [], []
+    for student_id in ids:
+        p, m = db.execute("""
+            SELECT COALESCE(SUM(lower(status) = 'present'), 0), COUNT(*) FROM attendance
+            WHERE student_id = ? AND attendance_date BETWEEN ? AND ?
+        """, (student_id, str(START), str(END))).fetchone()
+        present.append(p)
+        marked.append(m)
+    return present, marked
+
+
+def counts(index, db, ids=(1, 2, 3)):
+    index.warm(wait=True)
+    present, marked = index.counts(db.cursor(), list(ids), START, END)
+    return present.tolist(), marked.tolist()
+
+
+def test_writes_after_cold_start_are_replayed_not_rebuilt(index, db):
+    mark(db, [(1, "2026-01-05", "Present"), (2, "2026-01-05", "Absent")])
+    assert counts(index, db) == expected(db, (1, 2, 3))
+    assert len(index.rebuilds) == 1
+
+    # Upserts, status changes, a delete and a date outside the range
+    mark(db, [(1, "2026-01-06", "Present"), (2, "2026-01-05", "Present"),
+              (3, "2026-02-01", "Late"), (3, "2025-12-31", "Present")])
+    db.execute("DELETE FROM attendance WHERE student_id = 1 AND attendance_date = '2026-01-05'")
+    db.execute("UPDATE attendance SET attendance_date = '2026-03-01' WHERE student_id = 3 AND status = 'Late'")
+    db.commit()
+
+    assert counts(index, db) == expected(db, (1, 2, 3)) == ([1, 1, 0], [1, 1, 1])
+    assert len(index.rebuilds) == 1
+
+
+def test_rebuilds_when_the_log_was_pruned_past_it(index, db):
+    mark(db, [(1, "2026-01-05", "Present")])
+    counts(index, db)
+    mark(db, [(1, "2026-01-06", "Absent"), (2, "2026-01-06", "Present")])
+    # What the prune trigger does once an index is more than the retention behind
+    db.execute("DELETE FROM attendance_log WHERE seq < (SELECT MAX(seq) FROM attendance_log)")
+    mark(db, [(3, "2026-01-07", "Present")])
+
+    # The stale index answers from SQL while it rebuilds in the background
+    assert counts(index, db) == expected(db, (1, 2, 3))
+    index.warm(wait=True)
+    assert counts(index, db) == expected(db, (1, 2, 3))
+    assert len(index.rebuilds) == 2
+
+
+def test_rebuild_reads_the_table_in_chunks(index, db, sms, monkeypatch):
+    monkeypatch.setattr(sms, "ATTENDANCE_INDEX_CHUNK", 2)
+    days = np.arange(START, START + 30).astype(str)
+    mark(db, [(s, str(d), "Present" if (s + i) % 3 else "Absent") for s in (1, 2, 3) for i, d in enumerate(days)])
+
+    assert counts(index, db) == expected(db, (1, 2, 3))
+
+
+def test_cold_index_answers_from_sql_without_touching_the_callers_transaction(index, db, monkeypatch):
+    mark(db, [(1, "2026-01-05", "Present"), (2, "2026-01-05", "Absent"), (2, "2026-01-0x", "Present")])
+    started, release = threading.Event(), threading.Event()
+    rebuild = index.rebuild
+    monkeypatch.setattr(index, "rebuild", lambda: (started.set(), release.wait(), rebuild())[-1])
+
+    db.execute("INSERT INTO students (id, name, roll, branch, year) VALUES (4, 'S4', 'R4', 'Computer', 'FE')")
+    present, marked = index.counts(db.cursor(), [1, 2, 3], START, END)
+    assert started.wait(5)
+    assert db.in_transaction
+    # The malformed date is skipped, as the index skips it
+    assert (present.tolist(), marked.tolist()) == ([1, 0, 0], [1, 1, 0])
+
+    release.set()
+    index.warm(wait=True)
+    assert index.position is not None
+    db.rollback()
+
+
+def test_dates_are_parsed_like_fromisoformat(sms):
+    values = ["2024-02-29", "2023-02-29", "2024-13-01", "2024-1-05", "2024-01-05T10:00", None, "", "2024-04-30"]
+    dates, valid = sms.parse_dates(values)
+
+    assert valid.tolist() == [True, False, False, False, False, False, False, True]
+    assert dates[valid].astype(str).tolist() == ["2024-02-29", "2024-04-30"]
+
+
+def test_cohort_endpoint_sees_marks_from_the_api(admin, sms, db):
+    db.execute("INSERT INTO students (name, roll, branch, year) VALUES ('Asha', 'R1', 'Computer', 'FE')")
+    db.commit()
+    admin.post("/api/attendance", json={"student_id": 1, "date": "2026-01-05", "status": "Present"})
+    first = admin.get("/api/attendance/cohort?from=2026-01-01&to=2026-01-31").get_json()
+    admin.post("/api/attendance/batch", json={"date": "2026-01-06", "records": [{"student_id": 1, "status": "Absent"}]})
+    second = admin.get("/api/attendance/cohort?from=2026-01-01&to=2026-01-31").get_json()
+
+    assert first["students"][0]["percentage"] == 100.0
+    assert second["students"][0]["percentage"] == 50.0
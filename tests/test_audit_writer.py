@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+
+def make_writer(sms, **overrides):
+    options = dict(mode="async", batch_size=50, flush_interval=0.01, queue_size=100, overflow="block")
+    options.update(overrides)
+    return sms.AuditWriter(**options)
+
+
+def audit_rows(db):
+    return db.execute("SELECT user_id, action, details FROM audit_logs ORDER BY id").fetchall()
+
+
+def hold_writer(writer):
+    """Make the writer thread block inside its first batch until released"""
+    gate = threading.Event()
+    write_batch = writer._write_batch
+
+    def blocked(conn, batch):
+        gate.wait(5)
+        write_batch(conn, batch)
+
+    writer._write_batch = blocked
+    return gate
+
+
+def wait_until_taken(writer):
+    deadline = time.monotonic() + 5
+    while writer._queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_async_writer_commits_every_row_on_flush(sms, db):
+    writer = make_writer(sms, batch_size=7)
+    rows = [(1, "ACTION", f"row {i}", sms.utc_timestamp()) for i in range(40)]
+    for row in rows:
+        writer.submit(row)
+    writer.flush()
+
+    assert audit_rows(db) == [r[:3] for r in rows]
+    writer.close()
+
+
+def test_close_flushes_and_stops_the_thread(sms, db):
+    writer = make_writer(sms, flush_interval=1)
+    writer.submit((1, "ACTION", "pending", sms.utc_timestamp()))
+    thread = writer._thread
+    writer.close()
+
+    assert not thread.is_alive()
+    assert audit_rows(db) == [(1, "ACTION", "pending")]
+
+
+@pytest.mark.parametrize("overflow, written_before_release, dropped", [
+    ("drop", 0, 1),
+    ("sync", 1, 0),
+])
+def test_full_queue_follows_overflow_policy(sms, db, overflow, written_before_release, dropped):
+    writer = make_writer(sms, batch_size=1, queue_size=1, overflow=overflow)
+    gate = hold_writer(writer)
+
+    writer.submit((1, "FIRST", "", sms.utc_timestamp()))
+    wait_until_taken(writer)
+    writer.submit((1, "QUEUED", "", sms.utc_timestamp()))
+    writer.submit((1, "OVERFLOW", "", sms.utc_timestamp()))
+
+    assert len(audit_rows(db)) == written_before_release
+    assert writer.dropped == dropped
+    gate.set()
+    writer.close()
+    assert len(audit_rows(db)) == 3 - dropped
+
+
+def test_sync_mode_writes_with_the_callers_transaction(sms, db):
+    writer = make_writer(sms, mode="sync")
+    with sms.app.app_context():
+        writer.submit((1, "ROLLED_BACK", "", sms.utc_timestamp()))
+        sms.get_db().rollback()
+        writer.submit((1, "COMMITTED", "", sms.utc_timestamp()))
+        sms.get_db().commit()
+
+    assert audit_rows(db) == [(1, "COMMITTED", "")]
+    assert writer._thread is None
+
+
+def test_admin_actions_are_audited(admin, db):
+    response = admin.post("/api/students", json={"name": "Asha", "roll": "R1", "branch": "Computer", "year": "FE"})
+    assert response.status_code in (200, 201)
+
+    assert "ADD_STUDENT" in [action for _, action, _ in audit_rows(db)]
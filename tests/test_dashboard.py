@@ -0,0 +1,20 @@
+import datetime
+
+
+def test_summary_etag_changes_with_the_servers_date(admin, monkeypatch):
+    class Today(datetime.date):
+        current = datetime.date(2026, 1, 5)
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    monkeypatch.setattr(datetime, "date", Today)
+    first = admin.get("/api/dashboard/summary")
+    assert admin.get("/api/dashboard/summary", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    Today.current = datetime.date(2026, 1, 6)
+    after_midnight = admin.get("/api/dashboard/summary", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert after_midnight.status_code == 200
+    assert after_midnight.get_json()["attendance_today"]["date"] == "2026-01-06"
@@ -0,0 +1,94 @@
+import itertools
+
+import pytest
+
+STUDENT = {"name": "Asha Rao", "roll": "R1", "branch": "Computer", "year": "FE"}
+
+
+@pytest.fixture
+def broker(sms, monkeypatch):
+    """A fresh broker that polls and heartbeats quickly"""
+    broker = sms.EventBroker(buffer_size=4, poll_interval=0.01, heartbeat=0.2)
+    monkeypatch.setattr(sms, "event_broker", broker)
+    return broker
+
+
+def open_stream(client, path="/api/events", **headers):
+    """The response and its parsed events; gives up after 50 chunks, about 10 s of keepalives"""
+    response = client.get(path, headers=headers, buffered=False)
+    return response, parse_events(itertools.islice(response.response, 50))
+
+
+def parse_events(chunks):
+    for chunk in chunks:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        for frame in text.split("\n\n"):
+            if frame and not frame.startswith(("retry:", ":")):
+                yield dict(line.split(": ", 1) for line in frame.split("\n"))
+
+
+def test_stream_delivers_only_the_requested_kinds(admin, broker):
+    response, events = open_stream(admin, "/api/events?kinds=audit")
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    # Publishes student.added, then the audit entry
+    admin.post("/api/students", json=STUDENT)
+    event = next(events)
+    response.close()
+
+    assert event["event"] == "audit"
+    assert '"action":"ADD_STUDENT"' in event["data"]
+    assert broker.subscribers == 0
+
+
+def test_audit_events_are_admin_only(admin, sms, broker):
+    user = sms.app.test_client()
+    account = {"username": "viewer", "email": "viewer@example.com", "password": "viewer-password"}
+    user.post("/register", json=account)
+    user.post("/login", json=account)
+
+    response, events = open_stream(user)
+    admin.post("/api/students", json=STUDENT)
+    admin.post("/api/students", json={**STUDENT, "roll": "R2"})
+    received = [next(events)["event"] for _ in range(2)]
+    response.close()
+
+    assert received == ["student.added", "student.added"]
+
+
+def test_stale_last_event_id_gets_a_resync(admin, broker):
+    for i in range(3):
+        admin.post("/api/students", json={**STUDENT, "roll": f"R{i}"})
+
+    response, events = open_stream(admin, **{"Last-Event-ID": "1"})
+    event = next(events)
+    response.close()
+
+    assert event["event"] == "resync"
+
+
+def test_subscriber_cap_answers_503(admin, sms, broker, monkeypatch):
+    monkeypatch.setattr(sms, "EVENTS_MAX_SUBSCRIBERS", 1)
+    first = admin.get("/api/events", buffered=False)
+    next(first.response)    # the subscriber is counted once the stream starts
+    assert admin.get("/api/events").status_code == 503
+    first.close()
+    assert broker.subscribers == 0
+
+
+def test_stream_that_never_starts_is_not_counted(admin, broker):
+    response = admin.get("/api/events", buffered=False)
+    response.close()
+
+    assert broker.subscribers == 0
+
+
+def test_events_are_pruned_with_no_subscribers(admin, sms, db, monkeypatch):
+    monkeypatch.setattr(sms, "EVENTS_PRUNE_EVERY", 10)
+    monkeypatch.setattr(sms, "EVENTS_RETENTION_ROWS", 5)
+    for i in range(40):
+        admin.post("/api/students", json={**STUDENT, "roll": f"R{i}"})
+
+    kept = db.execute("SELECT COUNT(*) FROM change_events").fetchone()[0]
+    assert 0 < kept <= 5 + 10
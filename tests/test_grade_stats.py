@@ -0,0 +1,69 @@
+import pytest
+
+# name, branch, {subject: marks} in semester 1
+STUDENTS = [
+    ("Asha", "CSE", {"Maths": 95, "Physics": 85}),    # A+ 10, A 9: GPA 9.5, average 90
+    ("Ravi", "CSE", {"Maths": 91, "Physics": 81}),    # A+ 10, A 9: GPA 9.5, average 86
+    ("Meera", "CSE", {"Maths": 45, "Physics": 55}),   # F 0, D 6: GPA 3, average 50
+    ("Kabir", "ECE", {"Maths": 75}),                  # B 8: GPA 8, average 75
+]
+
+
+@pytest.fixture
+def graded(admin):
+    for i, (name, branch, marks) in enumerate(STUDENTS, start=1):
+        admin.post("/api/students", json={"name": name, "roll": f"R{i}", "branch": branch, "year": "1"})
+        for subject, mark in marks.items():
+            response = admin.post("/api/grades", json={"student_id": i, "subject": subject, "marks": mark, "semester": "1"})
+            assert response.status_code == 201
+    return admin
+
+
+def ranking(stats):
+    return [(s["name"], s["gpa"], s["average"], s["rank"]) for s in stats["students"]]
+
+
+def test_gpa_ties_share_a_rank_and_average_orders_them(graded):
+    stats = graded.get("/api/grades/stats?semester=1").get_json()
+
+    assert ranking(stats) == [
+        ("Asha", 9.5, 90.0, 1),
+        ("Ravi", 9.5, 86.0, 1),
+        ("Kabir", 8.0, 75.0, 3),
+        ("Meera", 3.0, 50.0, 4),
+    ]
+
+
+def test_distribution_of_a_slice(graded):
+    stats = graded.get("/api/grades/stats?semester=1").get_json()
+
+    assert stats["count"] == 7
+    assert stats["mean"] == round(527 / 7, 2)
+    assert stats["median"] == 81.0
+    assert (stats["min"], stats["max"]) == (45.0, 95.0)
+    assert stats["grade_distribution"] == {"A": 2, "A+": 2, "B": 1, "D": 1, "F": 1}
+    assert {h["from"]: h["count"] for h in stats["histogram"] if h["count"]} == {
+        40.0: 1, 50.0: 1, 70.0: 1, 80.0: 2, 90.0: 2
+    }
+
+
+def test_branch_filter_ranks_within_the_branch(graded):
+    stats = graded.get("/api/grades/stats?semester=1&subject=Maths&branch=CSE").get_json()
+
+    assert ranking(stats) == [("Asha", 10.0, 95.0, 1), ("Ravi", 10.0, 91.0, 1), ("Meera", 0.0, 45.0, 3)]
+
+
+def test_new_grades_invalidate_cached_stats(graded):
+    graded.get("/api/grades/stats?semester=1")
+    graded.post("/api/grades", json={"student_id": 3, "subject": "Chemistry", "marks": 100, "semester": "1"})
+    stats = graded.get("/api/grades/stats?semester=1").get_json()
+
+    assert ranking(stats)[-1] == ("Meera", 5.33, 66.67, 4)
+
+
+def test_unknown_branch_is_rejected_without_caching(graded, sms):
+    response = graded.get("/api/grades/stats?semester=1&branch=junk")
+
+    assert response.status_code == 400
+    graded.get("/api/grades/stats?semester=nope")
+    assert list(sms.grade_stats_cache.entries) == []
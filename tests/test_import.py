@@ -0,0 +1,40 @@
+import io
+
+
+def test_import_counts_inserted_rows(admin):
+    csv = "name,roll,branch,year\nAsha,R1,CSE,1\nRavi,R2,ECE,2\nRavi again,R2,ECE,2\n"
+    response = admin.post("/api/students/import", data={"file": (io.BytesIO(csv.encode()), "students.csv")})
+
+    assert response.get_json()["inserted"] == 2
+    assert response.get_json()["skipped"] == 1
+
+
+def test_rolls_taken_after_the_check_are_reported(sms, db):
+    class RacingCursor:
+        """Lets another import take roll R2 right after the duplicate check"""
+
+        def __init__(self, cursor):
+            self.cursor = cursor
+            self.raced = False
+
+        def __getattr__(self, name):
+            return getattr(self.cursor, name)
+
+        def fetchall(self):
+            rows = self.cursor.fetchall()
+            if not self.raced:
+                self.raced = True
+                other = sms.open_connection()
+                other.execute("INSERT INTO students (name, roll, branch, year) VALUES ('Other', 'R2', 'CSE', '1')")
+                other.commit()
+                other.close()
+            return rows
+
+    chunk = [(2, "Asha", "R1", "CSE", "1"), (3, "Ravi", "R2", "ECE", "2")]
+    errors = []
+    inserted = sms.insert_student_chunk(RacingCursor(db.cursor()), chunk, errors)
+    db.commit()
+
+    assert inserted == 1
+    assert errors == [(3, "Roll number already exists: R2")]
+    assert db.execute("SELECT name FROM students WHERE roll = 'R2'").fetchone() == ("Other",)
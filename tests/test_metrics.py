@@ -0,0 +1,17 @@
+def test_connection_shortcuts_are_counted(sms):
+    conn = sms.open_connection()
+    sms.query_stats.count = 0
+    conn.execute("CREATE TEMP TABLE scratch (x)")
+    conn.executemany("INSERT INTO scratch VALUES (?)", [(1,), (2,)])
+    conn.close()
+
+    assert sms.query_stats.count == 2
+
+
+def test_metrics_report_per_route_statements(admin, sms, monkeypatch):
+    monkeypatch.setattr(sms, "metrics", sms.Metrics())
+    admin.get("/api/students")
+    body = admin.get("/metrics").get_data(as_text=True)
+
+    assert 'http_requests_total{route="/api/students",method="GET",status="200"} 1' in body
+    assert 'db_queries_per_request_count{route="/api/students",method="GET"} 1' in body
@@ -0,0 +1,16 @@
+import threading
+
+
+def test_hasher_does_not_fork_a_multithreaded_process(sms):
+    hasher = sms.PasswordHasher("pbkdf2:sha256:1000", workers=1, max_concurrency=2, queue_timeout=5)
+    release = threading.Event()
+    busy = threading.Thread(target=release.wait)
+    busy.start()
+    try:
+        hasher.start()
+        assert hasher._pool._mp_context.get_start_method() != "fork"
+        assert hasher.verify(hasher.hash("secret"), "secret")
+    finally:
+        release.set()
+        busy.join()
+        hasher.close()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from backend import bench
+
+
+@pytest.fixture
+def seeded(sms, db):
+    """A small seed-data dataset and a client logged in as the bench admin"""
+    c = db.cursor()
+    rng = np.random.default_rng(7)
+    user_ids = bench.seed_users(c, rng, 5)
+    student_ids = bench.seed_students(c, rng, 300)
+    bench.seed_attendance(c, rng, student_ids, user_ids, 3000)
+    bench.seed_grades(c, rng, student_ids, user_ids, 1500)
+    bench.seed_audit_logs(c, rng, user_ids, 1500)
+    c.execute("ANALYZE")
+
+    client = sms.app.test_client()
+    login = {"username": bench.BENCH_USERNAME, "password": bench.BENCH_PASSWORD}
+    assert client.post("/login", json=login).status_code == 200
+    return client, bench.bench_samples(c)
+
+
+@pytest.mark.parametrize("route, method, path, body, heavy", [
+    pytest.param(*scenario, id=f"{scenario[1]} {scenario[0]}")
+    for scenario in bench.BENCH_SCENARIOS
+])
+def test_route_passes_query_audit(seeded, route, method, path, body, heavy):
+    client, sample = seeded
+    # A QueryAuditError raised after the view propagates out of the test client
+    response = client.open(
+        path.format(**sample), method=method,
+        json=body(sample) if callable(body) else body
+    )
+    response.get_data()
+    assert response.status_code < 400, response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("query", [
+    "branch=CSE", "year=2", "branch=CSE&year=2", "year=2&sort=name&limit=20", "branch=CSE&sort=roll&order=desc",
+])
+def test_filtered_student_listing_passes_query_audit(seeded, query):
+    client, _ = seeded
+    first = client.get(f"/api/students?limit=20&{query}")
+    assert first.status_code == 200, first.get_data(as_text=True)
+    cursor = first.headers.get("X-Next-Cursor")
+    if cursor:
+        page = client.get(f"/api/students?limit=20&{query}&cursor={cursor}")
+        assert page.status_code == 200, page.get_data(as_text=True)
+
+
+def test_budget_counts_each_request_separately_with_metrics_off(admin, sms, monkeypatch):
+    monkeypatch.setattr(sms, "METRICS_ENABLED", False)
+    admin.post("/api/students", json={"name": "Asha", "roll": "R1", "branch": "Computer", "year": "FE"})
+    for _ in range(sms.QUERY_BUDGET):
+        assert admin.get("/api/students/1/full").status_code == 200
+
+
+def test_statement_budget_is_enforced(admin, sms, monkeypatch):
+    monkeypatch.setattr(sms, "QUERY_BUDGET", 1)
+    with pytest.raises(sms.QueryAuditError, match="budget is 1"):
+        admin.get("/api/students/1/full")
+
+
+@pytest.mark.parametrize("sql, tables", [
+    ("SELECT * FROM students WHERE profile_picture = ? LIMIT 5", ["students"]),
+    ("SELECT * FROM students WHERE profile_picture = ?", ["students"]),
+    ("SELECT * FROM students LIMIT 5", []),
+    ("SELECT * FROM students ORDER BY id DESC LIMIT 5", []),
+    ("SELECT * FROM students ORDER BY profile_picture LIMIT 5", ["students"]),
+    ("SELECT * FROM students WHERE roll = ?", []),
+])
+def test_full_scan_detection(sms, db, sql, tables):
+    assert sms.full_scans(db, sql, ("x",) if "?" in sql else ()) == tables
@@ -0,0 +1,37 @@
+import base64
+import json
+
+import pytest
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    raw_cursor([[], []]),
+    raw_cursor([{"a": 1}, 1]),
+    raw_cursor(["Asha", "1"]),
+    raw_cursor(["Asha", True]),
+    raw_cursor([1, 2, 3]),
+    raw_cursor("Asha"),
+    "not base64!",
+])
+@pytest.mark.parametrize("path", ["/api/students?limit=1&sort=name", "/api/audit-logs?limit=1"])
+def test_malformed_cursors_are_rejected(admin, path, cursor):
+    response = admin.get(f"{path}&cursor={cursor}")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid cursor"
+
+
+def test_cursor_pages_through_students(admin):
+    for i in range(3):
+        admin.post("/api/students", json={"name": f"Student {i}", "roll": f"R{i}", "branch": "CSE", "year": "1"})
+
+    first = admin.get("/api/students?limit=2&sort=name")
+    second = admin.get(f"/api/students?limit=2&sort=name&cursor={first.headers['X-Next-Cursor']}")
+
+    names = [s["name"] for s in first.get_json() + second.get_json()]
+    assert names == ["Student 0", "Student 1", "Student 2"]
+    assert "X-Next-Cursor" not in second.headers
@@ -0,0 +1,129 @@
+import io
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+
+def image_bytes(color="red", fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def upload(client, student_id, data, name):
+    return client.post(
+        f"/api/students/{student_id}/profile-picture",
+        data={"file": (io.BytesIO(data), name)},
+        content_type="multipart/form-data"
+    )
+
+
+def blob(db, filename):
+    row = db.execute("SELECT refcount FROM upload_blobs WHERE filename = ?", (filename,)).fetchone()
+    return row[0] if row else None
+
+
+def orphan(db, filename):
+    """Drop every reference to a picture and age it past the GC grace period"""
+    db.execute("UPDATE students SET profile_picture = NULL WHERE profile_picture = ?", (filename,))
+    db.execute("UPDATE upload_blobs SET updated_at = datetime('now', '-2 days') WHERE filename = ?", (filename,))
+    db.commit()
+
+
+@pytest.fixture
+def students(admin, db):
+    db.executemany("INSERT INTO students (name, roll, branch, year) VALUES (?, ?, 'Computer', 'FE')",
+                   [("Asha", "R1"), ("Ravi", "R2")])
+    db.commit()
+    return admin
+
+
+def test_same_image_under_different_extensions_is_stored_once(students, sms, db):
+    data = image_bytes(fmt="JPEG")
+    first = upload(students, 1, data, "photo.jpeg").get_json()["filename"]
+    second = upload(students, 2, data, "PHOTO.JPG").get_json()["filename"]
+
+    assert first == second and first.endswith(".jpg")
+    assert blob(db, first) == 2
+    originals = [n for n in os.listdir(sms.UPLOAD_FOLDER) if not n.endswith(".tmp") and "_" not in n]
+    assert originals == [first]
+
+
+def test_extension_comes_from_the_content(students):
+    response = upload(students, 1, image_bytes(fmt="GIF"), "photo.png")
+    assert response.get_json()["filename"].endswith(".gif")
+
+
+def test_non_image_is_rejected(students, sms):
+    response = upload(students, 1, b"not an image", "photo.png")
+    assert response.status_code == 400
+    assert not [n for n in os.listdir(sms.UPLOAD_FOLDER) if n.endswith(".tmp")]
+
+
+def test_gc_removes_orphaned_pictures(students, sms, db):
+    filename = upload(students, 1, image_bytes(), "a.png").get_json()["filename"]
+    orphan(db, filename)
+
+    assert sms.collect_upload_garbage() == 1
+    assert not os.path.exists(os.path.join(sms.UPLOAD_FOLDER, filename))
+    assert blob(db, filename) is None
+
+
+def test_gc_waits_for_an_upload_reusing_the_orphaned_file(students, sms, db, monkeypatch):
+    data = image_bytes()
+    filename = upload(students, 1, data, "a.png").get_json()["filename"]
+    orphan(db, filename)
+
+    # Pause the new upload after it has found the existing file, holding its transaction open
+    placed, release = threading.Event(), threading.Event()
+    place_upload = sms.place_upload
+
+    def paused(tmp_path, name):
+        place_upload(tmp_path, name)
+        placed.set()
+        release.wait(5)
+
+    monkeypatch.setattr(sms, "place_upload", paused)
+    uploader = threading.Thread(target=upload, args=(students, 2, data, "b.png"))
+    uploader.start()
+    assert placed.wait(5)
+
+    results = []
+    collector = threading.Thread(target=lambda: results.append(sms.collect_upload_garbage()))
+    collector.start()
+    collector.join(0.3)
+    release.set()
+    uploader.join(5)
+    collector.join(5)
+
+    assert results == [0]
+    assert os.path.exists(os.path.join(sms.UPLOAD_FOLDER, filename))
+    assert blob(db, filename) == 1
+
+
+def test_variant_urls_do_not_depend_on_generation(students, sms):
+    filename = "0123456789abcdef0123456789abcdef.png"
+    urls = sms.picture_urls(filename)
+
+    assert urls["thumb"] == f"{sms.PROFILE_MEDIA_URL}/{sms.variant_name(filename, 'thumb')}"
+    assert urls["medium"] == f"{sms.PROFILE_MEDIA_URL}/{sms.variant_name(filename, 'medium')}"
+
+
+def test_media_route_serves_the_original_until_the_variant_exists(students, sms):
+    data = image_bytes()
+    filename = "0123456789abcdef0123456789abcdef.png"
+    with open(os.path.join(sms.UPLOAD_FOLDER, filename), "wb") as out:
+        out.write(data)
+    thumb = sms.picture_urls(filename)["thumb"]
+
+    pending = students.get(thumb)
+    assert pending.status_code == 200
+    assert pending.data == data
+    assert pending.headers["Cache-Control"] == "no-cache"
+
+    sms.generate_variants(filename)
+    ready = students.get(thumb)
+    assert ready.data != data
+    assert "immutable" in ready.headers["Cache-Control"]